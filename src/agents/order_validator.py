@@ -3,10 +3,23 @@ Agente de validación de órdenes usando LangGraph.
 Implementa un StateGraph con múltiples nodos de validación y manejo de errores.
 """
 
-from typing import TypedDict, List, Dict, Any, Literal, Optional
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import copy
+import operator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from typing import (
+    Annotated, AsyncIterator, Awaitable, Callable, TypedDict, List, Dict, Any,
+    Literal, Optional, Tuple, Union
+)
+from cachetools import TTLCache
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from loguru import logger
-import json
 
 from ..tools.validation_tools import (
     validate_customer_exists,
@@ -15,6 +28,74 @@ from ..tools.validation_tools import (
 )
 
 
+# Caché de resultados de herramientas: el estado y crédito de un cliente
+# cambian en escalas de minutos, así que ráfagas de órdenes del mismo
+# cliente reutilizan la misma consulta durante TOOL_CACHE_TTL segundos.
+# Es la única caché de resultados: las herramientas no memorizan nada.
+TOOL_CACHE_TTL = 60
+TOOL_CACHE_MAXSIZE = 10_000
+
+_customer_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL)
+_credit_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL)
+# TTLCache no es thread-safe y validate_order puede correr en hilos
+# distintos; el lock no se mantiene mientras se espera a la herramienta
+_tool_cache_lock = threading.Lock()
+
+
+async def _cached_customer(customer_id: str) -> Dict[str, Any]:
+    """
+    Valida un cliente reutilizando el resultado en caché si no ha expirado.
+    
+    Args:
+        customer_id: ID del cliente
+        
+    Returns:
+        Copia del resultado de validate_customer_exists, para que modificar
+        validation_details no altere la entrada en caché
+    """
+    with _tool_cache_lock:
+        result = _customer_cache.get(customer_id)
+    if result is None:
+        result = await validate_customer_exists.ainvoke({"customer_id": customer_id})
+        with _tool_cache_lock:
+            _customer_cache[customer_id] = result
+    return copy.deepcopy(result)
+
+
+async def _cached_credit(customer_id: str, order_amount: float) -> Dict[str, Any]:
+    """
+    Verifica crédito reutilizando el resultado en caché si no ha expirado.
+    
+    La clave usa el monto redondeado a centavos, la misma precisión con la
+    que se reportan los montos, para no aprobar montos distintos por error.
+    
+    Args:
+        customer_id: ID del cliente
+        order_amount: Monto total de la orden
+        
+    Returns:
+        Copia del resultado de check_customer_credit
+    """
+    key = (customer_id, round(order_amount, 2))
+    with _tool_cache_lock:
+        result = _credit_cache.get(key)
+    if result is None:
+        result = await check_customer_credit.ainvoke({
+            "customer_id": customer_id,
+            "order_amount": order_amount
+        })
+        with _tool_cache_lock:
+            _credit_cache[key] = result
+    return copy.deepcopy(result)
+
+
+def clear_tool_caches() -> None:
+    """Vacía las cachés de resultados de clientes y crédito."""
+    with _tool_cache_lock:
+        _customer_cache.clear()
+        _credit_cache.clear()
+
+
 class OrderState(TypedDict):
     """Estado del proceso de validación de orden."""
     # Datos de entrada
@@ -29,8 +110,9 @@ class OrderState(TypedDict):
     
     # Estado del proceso
     status: str  # "pending", "validating", "approved", "rejected", "error"
-    errors: List[str]
-    warnings: List[str]
+    # Reducers: los nodos paralelos agregan errores/advertencias sin pisarse
+    errors: Annotated[List[str], operator.add]
+    warnings: Annotated[List[str], operator.add]
     
     # Resultado final
     total_amount: float
@@ -39,7 +121,45 @@ class OrderState(TypedDict):
     validation_details: Dict[str, Any]
 
 
-def parse_order(state: OrderState) -> OrderState:
+NodeFn = Callable[[OrderState], Awaitable[Dict[str, Any]]]
+
+
+def node_with_error_capture(
+    field: str,
+    default: Dict[str, Any],
+    error_prefix: str
+) -> Callable[[NodeFn], NodeFn]:
+    """
+    Decorador que captura excepciones de un nodo de validación.
+    
+    Si el nodo falla, registra el error y devuelve una actualización con
+    el mensaje en errors y el resultado por defecto en el campo indicado.
+    
+    Args:
+        field: Campo del estado donde se guarda el resultado de validación
+        default: Resultado de validación fallida (sin el mensaje)
+        error_prefix: Prefijo del mensaje de error
+        
+    Returns:
+        Decorador para nodos asíncronos
+    """
+    def decorator(fn: NodeFn) -> NodeFn:
+        @wraps(fn)
+        async def wrapper(state: OrderState) -> Dict[str, Any]:
+            try:
+                return await fn(state)
+            except Exception as e:
+                error_msg = f"{error_prefix}: {str(e)}"
+                logger.error(error_msg)
+                return {
+                    field: {**default, "message": error_msg},
+                    "errors": [error_msg]
+                }
+        return wrapper
+    return decorator
+
+
+def parse_order(state: OrderState) -> Dict[str, Any]:
     """
     Nodo inicial: parsea y valida la estructura básica de la orden.
     
@@ -47,125 +167,131 @@ def parse_order(state: OrderState) -> OrderState:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con validaciones iniciales
+        Actualización del estado con validaciones iniciales
     """
-    logger.info(f"Parseando orden {state.get('order_id', 'N/A')}")
+    order_id = state["order_id"]
+    logger.info("Parseando orden {}", order_id)
     
+    # Los campos vienen del estado inicial de validate_order_async,
+    # así que se leen directamente sin .get()
     errors = []
-    warnings = []
     
     # Validar campos requeridos
-    if not state.get("order_id"):
+    if not order_id:
         errors.append("ID de orden no proporcionado")
     
-    if not state.get("customer_id"):
+    if not state["customer_id"]:
         errors.append("ID de cliente no proporcionado")
     
-    if not state.get("items"):
-        errors.append("No se proporcionaron items en la orden")
-    elif not isinstance(state["items"], list):
-        errors.append("Items debe ser una lista")
-    elif len(state["items"]) == 0:
-        errors.append("La lista de items está vacía")
-    
-    # Actualizar estado
-    state["errors"] = errors
-    state["warnings"] = warnings
-    state["status"] = "error" if errors else "validating"
-    state["approved"] = False
-    state["total_amount"] = 0.0
-    state["validation_details"] = {}
-    
-    if errors:
-        logger.error(f"Errores en parseo de orden {state.get('order_id')}: {errors}")
-        state["message"] = f"Errores en estructura de orden: {'; '.join(errors)}"
-    else:
-        logger.info(f"Orden {state['order_id']} parseada correctamente")
-        state["message"] = "Orden parseada, iniciando validaciones"
+    items = state["items"]
+    if not (isinstance(items, list) and items):
+        errors.append(
+            "No se proporcionaron items en la orden" if not items
+            else "Items debe ser una lista"
+        )
     
-    return state
+    if not errors:
+        logger.info("Orden {} parseada correctamente", order_id)
+        return {
+            "status": "validating",
+            "message": "Orden parseada, iniciando validaciones"
+        }
+    
+    logger.error("Errores en parseo de orden {}: {}", order_id, errors)
+    return {
+        "errors": errors,
+        "status": "error",
+        "message": f"Errores en estructura de orden: {'; '.join(errors)}"
+    }
 
 
-def validate_customer_node(state: OrderState) -> OrderState:
+@node_with_error_capture("customer_validation", {"valid": False}, "Error al validar cliente")
+async def validate_customer_node(state: OrderState) -> Dict[str, Any]:
     """
     Nodo de validación: verifica que el cliente existe y está activo.
     
+    Se ejecuta en paralelo con validate_items_node, por lo que solo
+    devuelve las claves que modifica.
+    
     Args:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con resultado de validación de cliente
+        Actualización del estado con resultado de validación de cliente
     """
-    logger.info(f"Validando cliente {state['customer_id']} para orden {state['order_id']}")
+    logger.info("Validando cliente {} para orden {}", state["customer_id"], state["order_id"])
     
-    try:
-        # Invocar herramienta de validación
-        result = validate_customer_exists.invoke({"customer_id": state["customer_id"]})
-        
-        state["customer_validation"] = result
-        
-        if not result["valid"]:
-            state["errors"].append(result["message"])
-            logger.warning(f"Validación de cliente fallida: {result['message']}")
-        else:
-            logger.info(f"Cliente validado exitosamente: {state['customer_id']}")
-        
-    except Exception as e:
-        error_msg = f"Error al validar cliente: {str(e)}"
-        state["errors"].append(error_msg)
-        logger.error(error_msg)
-        state["customer_validation"] = {
-            "valid": False,
-            "message": error_msg
-        }
+    # Invocar herramienta de validación (con caché TTL)
+    result = await _cached_customer(state["customer_id"])
     
-    return state
+    update = {"customer_validation": result}
+    
+    if not result["valid"]:
+        update["errors"] = [result["message"]]
+        logger.warning("Validación de cliente fallida: {}", result["message"])
+    else:
+        logger.info("Cliente validado exitosamente: {}", state["customer_id"])
+    
+    return update
 
 
-def validate_items_node(state: OrderState) -> OrderState:
+@node_with_error_capture("items_validation", {"valid": False}, "Error al validar items")
+async def validate_items_node(state: OrderState) -> Dict[str, Any]:
     """
     Nodo de validación: verifica items, stock y calcula total.
     
+    Se ejecuta en paralelo con validate_customer_node, por lo que solo
+    devuelve las claves que modifica.
+    
     Args:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con resultado de validación de items
+        Actualización del estado con resultado de validación de items
     """
-    logger.info(f"Validando items para orden {state['order_id']}")
+    logger.info("Validando items para orden {}", state["order_id"])
     
-    try:
-        # Invocar herramienta de validación
-        result = validate_order_items.invoke({"items": state["items"]})
-        
-        state["items_validation"] = result
-        state["total_amount"] = result.get("total_amount", 0.0)
+    # Invocar herramienta de validación
+    result = await validate_order_items.ainvoke({"items": state["items"]})
+    
+    update = {
+        "items_validation": result,
+        "total_amount": result.get("total_amount", 0.0)
+    }
+    
+    if not result["valid"]:
+        logger.warning("Validación de items fallida: {}", result["message"])
         
-        if not result["valid"]:
-            state["errors"].append(result["message"])
-            logger.warning(f"Validación de items fallida: {result['message']}")
-            
-            # Agregar detalles de items inválidos
-            for invalid_item in result.get("invalid_items", []):
-                state["errors"].append(
-                    f"Item {invalid_item['product_id']}: {invalid_item['reason']}"
-                )
-        else:
-            logger.info(f"Items validados exitosamente. Total: ${result['total_amount']:.2f}")
+        # Mensaje general seguido del detalle de cada item inválido
+        errors = [result["message"]]
+        errors.extend(
+            f"Item {invalid_item['product_id']}: {invalid_item['reason']}"
+            for invalid_item in result.get("invalid_items") or ()
+        )
+        update["errors"] = errors
+    else:
+        logger.info("Items validados exitosamente. Total: ${:.2f}", result["total_amount"])
+    
+    return update
+
+
+def join_validations(state: OrderState) -> Dict[str, Any]:
+    """
+    Nodo de unión: espera a que terminen las validaciones de cliente e items.
+    
+    Args:
+        state: Estado actual de la orden
         
-    except Exception as e:
-        error_msg = f"Error al validar items: {str(e)}"
-        state["errors"].append(error_msg)
-        logger.error(error_msg)
-        state["items_validation"] = {
-            "valid": False,
-            "message": error_msg
-        }
+    Returns:
+        Actualización vacía; el enrutamiento posterior decide el siguiente paso
+    """
+    logger.debug("Validaciones de cliente e items completadas para orden {}", state["order_id"])
     
-    return state
+    return {}
 
 
-def check_credit_node(state: OrderState) -> OrderState:
+@node_with_error_capture("credit_validation", {"has_credit": False}, "Error al verificar crédito")
+async def check_credit_node(state: OrderState) -> Dict[str, Any]:
     """
     Nodo de validación: verifica crédito disponible del cliente.
     
@@ -173,38 +299,61 @@ def check_credit_node(state: OrderState) -> OrderState:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con resultado de validación de crédito
+        Actualización del estado con resultado de validación de crédito
     """
-    logger.info(f"Verificando crédito para orden {state['order_id']}")
+    logger.info("Verificando crédito para orden {}", state["order_id"])
     
-    try:
-        # Invocar herramienta de validación
-        result = check_customer_credit.invoke({
-            "customer_id": state["customer_id"],
-            "order_amount": state["total_amount"]
-        })
-        
-        state["credit_validation"] = result
-        
-        if not result["has_credit"]:
-            state["errors"].append(result["message"])
-            logger.warning(f"Validación de crédito fallida: {result['message']}")
-        else:
-            logger.info(f"Crédito suficiente para orden {state['order_id']}")
+    # Invocar herramienta de validación (con caché TTL)
+    result = await _cached_credit(state["customer_id"], state["total_amount"])
+    
+    update = {"credit_validation": result}
+    
+    if not result["has_credit"]:
+        update["errors"] = [result["message"]]
+        logger.warning("Validación de crédito fallida: {}", result["message"])
+    else:
+        logger.info("Crédito suficiente para orden {}", state["order_id"])
+    
+    return update
+
+
+def _compile_validation_details(state: OrderState, approved: bool) -> Dict[str, Any]:
+    """
+    Compila los detalles de validación para los nodos terminales.
+    
+    Args:
+        state: Estado actual de la orden
+        approved: Si la orden fue aprobada
         
-    except Exception as e:
-        error_msg = f"Error al verificar crédito: {str(e)}"
-        state["errors"].append(error_msg)
-        logger.error(error_msg)
-        state["credit_validation"] = {
-            "has_credit": False,
-            "message": error_msg
-        }
+    Returns:
+        Dict con los resultados de cada validación y un resumen; las
+        órdenes rechazadas incluyen además errores y advertencias
+    """
+    items_validation = state["items_validation"] or {}
+    summary = {
+        "order_id": state["order_id"],
+        "customer_id": state["customer_id"],
+        "total_amount": state["total_amount"],
+        "approved": approved
+    }
+    details = {
+        "customer": state["customer_validation"] or {},
+        "items": items_validation,
+        "credit": state["credit_validation"] or {},
+        "summary": summary
+    }
+    
+    if approved:
+        summary["items_count"] = len(items_validation.get("validated_items", ()))
+    else:
+        details["errors"] = state["errors"]
+        details["warnings"] = state["warnings"]
+        summary["error_count"] = len(state["errors"])
     
-    return state
+    return details
 
 
-def process_order_node(state: OrderState) -> OrderState:
+def process_order_node(state: OrderState) -> Dict[str, Any]:
     """
     Nodo final: procesa la orden aprobada y genera resultado final.
     
@@ -212,34 +361,25 @@ def process_order_node(state: OrderState) -> OrderState:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con resultado final
+        Actualización del estado con resultado final
     """
-    logger.info(f"Procesando orden aprobada {state['order_id']}")
+    logger.info("Procesando orden aprobada {}", state["order_id"])
     
-    state["status"] = "approved"
-    state["approved"] = True
-    state["message"] = f"Orden {state['order_id']} aprobada exitosamente. Total: ${state['total_amount']:.2f}"
+    update = {
+        "status": "approved",
+        "approved": True,
+        "message": f"Orden {state['order_id']} aprobada exitosamente. Total: ${state['total_amount']:.2f}"
+    }
     
     # Compilar detalles de validación
-    state["validation_details"] = {
-        "customer": state.get("customer_validation", {}),
-        "items": state.get("items_validation", {}),
-        "credit": state.get("credit_validation", {}),
-        "summary": {
-            "order_id": state["order_id"],
-            "customer_id": state["customer_id"],
-            "total_amount": state["total_amount"],
-            "items_count": len(state.get("items_validation", {}).get("validated_items", [])),
-            "approved": True
-        }
-    }
+    update["validation_details"] = _compile_validation_details(state, approved=True)
     
-    logger.info(f"Orden {state['order_id']} procesada exitosamente")
+    logger.info("Orden {} procesada exitosamente", state["order_id"])
     
-    return state
+    return update
 
 
-def error_handler_node(state: OrderState) -> OrderState:
+def error_handler_node(state: OrderState) -> Dict[str, Any]:
     """
     Nodo de manejo de errores: procesa órdenes rechazadas.
     
@@ -247,62 +387,56 @@ def error_handler_node(state: OrderState) -> OrderState:
         state: Estado actual de la orden
         
     Returns:
-        Estado actualizado con información de rechazo
+        Actualización del estado con información de rechazo
     """
-    logger.warning(f"Manejando errores para orden {state['order_id']}")
-    
-    state["status"] = "rejected"
-    state["approved"] = False
+    logger.warning("Manejando errores para orden {}", state["order_id"])
     
     error_count = len(state["errors"])
-    state["message"] = f"Orden {state['order_id']} rechazada. {error_count} error(es) encontrado(s)."
+    update = {
+        "status": "rejected",
+        "approved": False,
+        "message": f"Orden {state['order_id']} rechazada. {error_count} error(es) encontrado(s)."
+    }
     
     # Compilar detalles de validación con errores
-    state["validation_details"] = {
-        "customer": state.get("customer_validation", {}),
-        "items": state.get("items_validation", {}),
-        "credit": state.get("credit_validation", {}),
-        "errors": state["errors"],
-        "warnings": state["warnings"],
-        "summary": {
-            "order_id": state["order_id"],
-            "customer_id": state.get("customer_id", "N/A"),
-            "total_amount": state["total_amount"],
-            "approved": False,
-            "error_count": error_count
-        }
-    }
+    update["validation_details"] = _compile_validation_details(state, approved=False)
     
-    logger.info(f"Orden {state['order_id']} rechazada con {error_count} errores")
+    logger.info("Orden {} rechazada con {} errores", state["order_id"], error_count)
     
-    return state
+    return update
 
 
 # Funciones de enrutamiento condicional
 
-def should_continue_after_customer(state: OrderState) -> Literal["validate_items", "error_handler"]:
+def should_continue_after_parse(state: OrderState) -> Union[List[Send], Literal["error_handler"]]:
     """
-    Decide si continuar a validación de items o ir a manejo de errores.
+    Decide si lanzar en paralelo las validaciones de cliente e items o ir a
+    manejo de errores.
     
     Args:
         state: Estado actual
         
     Returns:
-        Nombre del siguiente nodo
+        Envíos a los nodos de validación, o nombre del nodo de errores
     """
-    customer_valid = state.get("customer_validation", {}).get("valid", False)
-    
-    if customer_valid:
-        logger.debug("Cliente válido, continuando a validación de items")
-        return "validate_items"
+    if state["status"] == "validating":
+        logger.debug("Orden parseada, lanzando validaciones de cliente e items")
+        return [Send("validate_customer", state), Send("validate_items", state)]
     else:
-        logger.debug("Cliente inválido, redirigiendo a manejo de errores")
+        logger.debug("Orden mal formada, redirigiendo a manejo de errores")
         return "error_handler"
 
 
-def should_continue_after_items(state: OrderState) -> Literal["check_credit", "error_handler"]:
+def should_continue_after_validations(
+    state: OrderState
+) -> Literal["check_credit", "process_order", "error_handler"]:
     """
-    Decide si continuar a validación de crédito o ir a manejo de errores.
+    Decide si continuar a validación de crédito o ir a manejo de errores,
+    una vez completadas las validaciones paralelas de cliente e items.
+    
+    Las órdenes sin monto y los clientes con crédito ilimitado
+    (customer_data["credit_unlimited"]) no requieren verificar crédito y
+    pasan directamente a procesarse.
     
     Args:
         state: Estado actual
@@ -310,14 +444,21 @@ def should_continue_after_items(state: OrderState) -> Literal["check_credit", "e
     Returns:
         Nombre del siguiente nodo
     """
-    items_valid = state.get("items_validation", {}).get("valid", False)
+    customer_validation = state.get("customer_validation") or {}
+    customer_valid = customer_validation.get("valid", False)
+    items_valid = (state.get("items_validation") or {}).get("valid", False)
     
-    if items_valid:
-        logger.debug("Items válidos, continuando a verificación de crédito")
-        return "check_credit"
-    else:
-        logger.debug("Items inválidos, redirigiendo a manejo de errores")
+    if not (customer_valid and items_valid):
+        logger.debug("Cliente o items inválidos, redirigiendo a manejo de errores")
         return "error_handler"
+    
+    customer_data = customer_validation.get("customer_data") or {}
+    if state["total_amount"] <= 0 or customer_data.get("credit_unlimited", False):
+        logger.debug("Orden sin monto o cliente con crédito ilimitado, omitiendo verificación de crédito")
+        return "process_order"
+    
+    logger.debug("Cliente e items válidos, continuando a verificación de crédito")
+    return "check_credit"
 
 
 def should_continue_after_credit(state: OrderState) -> Literal["process_order", "error_handler"]:
@@ -358,6 +499,7 @@ def create_order_validation_graph() -> StateGraph:
     workflow.add_node("parse_order", parse_order)
     workflow.add_node("validate_customer", validate_customer_node)
     workflow.add_node("validate_items", validate_items_node)
+    workflow.add_node("join_validations", join_validations)
     workflow.add_node("check_credit", check_credit_node)
     workflow.add_node("process_order", process_order_node)
     workflow.add_node("error_handler", error_handler_node)
@@ -365,20 +507,19 @@ def create_order_validation_graph() -> StateGraph:
     # Definir punto de entrada
     workflow.set_entry_point("parse_order")
     
-    # Agregar edges condicionales
+    # Agregar edges condicionales: cliente e items se validan en paralelo
     workflow.add_conditional_edges(
         "parse_order",
-        lambda state: "validate_customer" if state["status"] == "validating" else "error_handler"
+        should_continue_after_parse,
+        ["validate_customer", "validate_items", "error_handler"]
     )
     
-    workflow.add_conditional_edges(
-        "validate_customer",
-        should_continue_after_customer
-    )
+    # Esperar a ambas validaciones antes de decidir
+    workflow.add_edge(["validate_customer", "validate_items"], "join_validations")
     
     workflow.add_conditional_edges(
-        "validate_items",
-        should_continue_after_items
+        "join_validations",
+        should_continue_after_validations
     )
     
     workflow.add_conditional_edges(
@@ -398,15 +539,33 @@ def create_order_validation_graph() -> StateGraph:
     return app
 
 
+# Máximo de órdenes validadas en simultáneo por validate_orders_batch_async
+DEFAULT_BATCH_CONCURRENCY = 10
+
+
+@lru_cache(maxsize=1)
+def _get_app():
+    """
+    Devuelve el grafo compilado, construyéndolo solo en la primera llamada.
+    
+    El grafo compilado es inmutable, por lo que puede reutilizarse entre
+    invocaciones concurrentes.
+    
+    Returns:
+        Grafo de validación compilado
+    """
+    return create_order_validation_graph()
+
+
 # Función principal de validación
 
-def validate_order(
+def _build_initial_state(
     order_id: str,
     customer_id: str,
     items: List[Dict[str, Any]]
-) -> Dict[str, Any]:
+) -> OrderState:
     """
-    Valida una orden completa usando el grafo de LangGraph.
+    Construye el estado inicial del grafo para una orden.
     
     Args:
         order_id: ID único de la orden
@@ -414,19 +573,9 @@ def validate_order(
         items: Lista de items de la orden
         
     Returns:
-        Dict con resultado de validación:
-        - status: estado final ("approved" o "rejected")
-        - approved: bool indicando si fue aprobada
-        - message: mensaje descriptivo
-        - total_amount: monto total de la orden
-        - errors: lista de errores encontrados
-        - warnings: lista de advertencias
-        - validation_details: detalles completos de validación
+        Estado inicial con todos los campos de OrderState
     """
-    logger.info(f"Iniciando validación de orden {order_id}")
-    
-    # Crear estado inicial
-    initial_state: OrderState = {
+    return {
         "order_id": order_id,
         "customer_id": customer_id,
         "items": items,
@@ -441,37 +590,286 @@ def validate_order(
         "message": "",
         "validation_details": {}
     }
+
+
+def _build_result(final_state: OrderState) -> Dict[str, Any]:
+    """
+    Extrae el resultado público a partir del estado final del grafo.
+    
+    Args:
+        final_state: Estado final tras ejecutar el grafo
+        
+    Returns:
+        Dict con resultado de validación (ver validate_order_async)
+    """
+    return {
+        "status": final_state["status"],
+        "approved": final_state["approved"],
+        "message": final_state["message"],
+        "total_amount": final_state["total_amount"],
+        "errors": final_state["errors"],
+        "warnings": final_state["warnings"],
+        "validation_details": final_state["validation_details"]
+    }
+
+
+def _build_error_result(order_id: str, error: Exception) -> Dict[str, Any]:
+    """
+    Construye el resultado para un fallo inesperado al ejecutar el grafo.
+    
+    Args:
+        order_id: ID de la orden
+        error: Excepción capturada
+        
+    Returns:
+        Dict con resultado de validación en estado "error"
+    """
+    error_msg = f"Error crítico en validación de orden {order_id}: {str(error)}"
+    logger.error(error_msg)
+    
+    return {
+        "status": "error",
+        "approved": False,
+        "message": error_msg,
+        "total_amount": 0.0,
+        "errors": [error_msg],
+        "warnings": [],
+        "validation_details": {}
+    }
+
+
+async def validate_order_async(
+    order_id: str,
+    customer_id: str,
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Valida una orden completa usando el grafo de LangGraph (versión asíncrona).
+    
+    Args:
+        order_id: ID único de la orden
+        customer_id: ID del cliente
+        items: Lista de items de la orden
+        
+    Returns:
+        Dict con resultado de validación:
+        - status: estado final ("approved" o "rejected")
+        - approved: bool indicando si fue aprobada
+        - message: mensaje descriptivo
+        - total_amount: monto total de la orden
+        - errors: lista de errores encontrados
+        - warnings: lista de advertencias
+        - validation_details: detalles completos de validación
+    """
+    logger.info("Iniciando validación de orden {}", order_id)
+    
+    initial_state = _build_initial_state(order_id, customer_id, items)
     
     try:
-        # Crear y ejecutar el grafo
-        app = create_order_validation_graph()
-        final_state = app.invoke(initial_state)
-        
-        # Preparar resultado
-        result = {
-            "status": final_state["status"],
-            "approved": final_state["approved"],
-            "message": final_state["message"],
-            "total_amount": final_state["total_amount"],
-            "errors": final_state["errors"],
-            "warnings": final_state["warnings"],
-            "validation_details": final_state["validation_details"]
-        }
+        # Ejecutar el grafo compilado (se construye una sola vez)
+        app = _get_app()
+        final_state = await app.ainvoke(initial_state)
+        
+        result = _build_result(final_state)
         
-        logger.info(f"Validación completada para orden {order_id}: {result['status']}")
+        logger.info("Validación completada para orden {}: {}", order_id, result["status"])
         
         return result
         
     except Exception as e:
-        error_msg = f"Error crítico en validación de orden {order_id}: {str(e)}"
-        logger.error(error_msg)
+        return _build_error_result(order_id, e)
+
+
+async def validate_order_stream(
+    order_id: str,
+    customer_id: str,
+    items: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Valida una orden emitiendo el progreso de cada nodo a medida que termina.
+    
+    Args:
+        order_id: ID único de la orden
+        customer_id: ID del cliente
+        items: Lista de items de la orden
         
-        return {
-            "status": "error",
-            "approved": False,
-            "message": error_msg,
-            "total_amount": 0.0,
-            "errors": [error_msg],
-            "warnings": [],
-            "validation_details": {}
-        }
\ No newline at end of file
+    Yields:
+        Tuplas (nombre_nodo, actualización) por cada nodo completado. El
+        último evento es (END, resultado), con el mismo formato que
+        validate_order_async.
+    """
+    logger.info("Iniciando validación en streaming de orden {}", order_id)
+    
+    initial_state = _build_initial_state(order_id, customer_id, items)
+    
+    try:
+        app = _get_app()
+        final_state = initial_state
+        
+        async for mode, chunk in app.astream(initial_state, stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node_name, update in chunk.items():
+                yield node_name, update or {}
+        
+        result = _build_result(final_state)
+        logger.info("Validación completada para orden {}: {}", order_id, result["status"])
+        
+    except Exception as e:
+        result = _build_error_result(order_id, e)
+    
+    yield END, result
+
+
+def _apply_update(state: OrderState, update: Dict[str, Any]) -> None:
+    """
+    Aplica la actualización de un nodo al estado, replicando los reducers
+    de OrderState (errors y warnings se concatenan).
+    
+    Args:
+        state: Estado a modificar
+        update: Actualización devuelta por un nodo
+    """
+    for key, value in update.items():
+        if key in ("errors", "warnings"):
+            state[key] = state[key] + value
+        else:
+            state[key] = value
+
+
+async def validate_order_fast(
+    order_id: str,
+    customer_id: str,
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Valida una orden ejecutando los nodos directamente, sin el ejecutor de
+    LangGraph.
+    
+    Recorre los mismos nodos y funciones de enrutamiento que el grafo
+    (cliente e items en paralelo, luego crédito), por lo que el resultado
+    es idéntico al de validate_order_async. Usar el grafo cuando se
+    necesiten checkpoints, streaming o intervención humana.
+    
+    Args:
+        order_id: ID único de la orden
+        customer_id: ID del cliente
+        items: Lista de items de la orden
+        
+    Returns:
+        Dict con resultado de validación (ver validate_order_async)
+    """
+    logger.info("Iniciando validación rápida de orden {}", order_id)
+    
+    state = _build_initial_state(order_id, customer_id, items)
+    
+    try:
+        _apply_update(state, parse_order(state))
+        
+        next_node = "error_handler"
+        if state["status"] == "validating":
+            customer_update, items_update = await asyncio.gather(
+                validate_customer_node(state),
+                validate_items_node(state)
+            )
+            _apply_update(state, customer_update)
+            _apply_update(state, items_update)
+            
+            next_node = should_continue_after_validations(state)
+            if next_node == "check_credit":
+                _apply_update(state, await check_credit_node(state))
+                next_node = should_continue_after_credit(state)
+        
+        terminal_node = process_order_node if next_node == "process_order" else error_handler_node
+        _apply_update(state, terminal_node(state))
+        
+        result = _build_result(state)
+        
+        logger.info("Validación completada para orden {}: {}", order_id, result["status"])
+        
+        return result
+        
+    except Exception as e:
+        return _build_error_result(order_id, e)
+
+
+def validate_order(
+    order_id: str,
+    customer_id: str,
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Valida una orden completa usando el grafo de LangGraph.
+    
+    Envoltorio síncrono de validate_order_async. Si se llama desde un
+    event loop en ejecución, la validación corre en un hilo aparte con su
+    propio loop (bloqueando el llamador); desde código async es preferible
+    usar validate_order_async directamente.
+    
+    Args:
+        order_id: ID único de la orden
+        customer_id: ID del cliente
+        items: Lista de items de la orden
+        
+    Returns:
+        Dict con resultado de validación (ver validate_order_async)
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(validate_order_async(order_id, customer_id, items))
+    
+    logger.warning("validate_order llamado dentro de un event loop; se ejecuta en un hilo aparte")
+    # La corrutina se crea dentro del hilo y hereda el contexto del llamador
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(
+            context.run, lambda: asyncio.run(validate_order_async(order_id, customer_id, items))
+        )
+        return future.result()
+
+
+async def validate_orders_batch_async(
+    orders: List[Dict[str, Any]],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Valida varias órdenes independientes de forma concurrente.
+    
+    La concurrencia se limita con un semáforo para no saturar los
+    servicios de clientes y crédito.
+    
+    Args:
+        orders: Lista de órdenes con order_id, customer_id e items
+        max_concurrency: Máximo de órdenes en validación simultánea
+        on_result: Callback opcional invocado con (índice, resultado) a
+            medida que termina cada orden, útil para mostrar progreso; sus
+            excepciones se registran y no cancelan el lote
+        
+    Returns:
+        Lista de resultados en el mismo orden que las órdenes recibidas
+        (ver validate_order_async)
+    """
+    logger.info("Validando lote de {} órdenes (concurrencia máx: {})", len(orders), max_concurrency)
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def _validate(index: int, order: Dict[str, Any]) -> Dict[str, Any]:
+        # Los campos faltantes llegan vacíos y parse_order los reporta como
+        # error de esa orden, sin interrumpir el resto del lote
+        async with semaphore:
+            result = await validate_order_async(
+                order_id=order.get("order_id", ""),
+                customer_id=order.get("customer_id", ""),
+                items=order.get("items", [])
+            )
+        if on_result is not None:
+            try:
+                on_result(index, result)
+            except Exception:
+                logger.exception("Error en on_result para la orden en posición {}", index)
+        return result
+    
+    return await asyncio.gather(*(_validate(i, order) for i, order in enumerate(orders)))
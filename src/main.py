@@ -3,8 +3,11 @@ CLI principal para el sistema de validación de órdenes.
 Incluye ejemplos de validación y modo interactivo.
 """
 
+import asyncio
+import logging
 import sys
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -13,7 +16,10 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich import box
 from loguru import logger
 
-from .agents.order_validator import validate_order
+from langgraph.graph import END
+
+from .agents.order_validator import validate_orders_batch_async, validate_order_stream
+from .tools.validation_tools import item_log
 
 # Configurar consola Rich
 console = Console()
@@ -26,52 +32,85 @@ logger.add(
     level="INFO"
 )
 
+# Las herramientas registran el detalle por item con logging estándar.
+# Solo se configura su logger: el raíz queda intacto para no mostrar los
+# mensajes INFO de httpx, google-genai, langsmith, etc.
+_item_handler = logging.StreamHandler(sys.stderr)
+_item_handler.setFormatter(logging.Formatter(
+    "%(asctime)s | %(levelname)-8s | %(name)s:%(funcName)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+))
+item_log.addHandler(_item_handler)
+item_log.setLevel(logging.INFO)
+item_log.propagate = False
+
+
+@dataclass(frozen=True, slots=True)
+class ExampleOrder:
+    """Orden de ejemplo inmutable para las validaciones de demostración."""
+    order_id: str
+    customer_id: str
+    items: Tuple[Dict[str, Any], ...]
+    description: str
+
 
 # Ejemplos de órdenes para pruebas
-EXAMPLE_ORDERS = {
-    "CUST001": {
-        "order_id": "ORD-001",
-        "customer_id": "CUST001",
-        "items": [
+EXAMPLE_ORDERS: Tuple[ExampleOrder, ...] = (
+    ExampleOrder(
+        order_id="ORD-001",
+        customer_id="CUST001",
+        items=(
             {"product_id": "PROD001", "quantity": 2, "unit_price": 1200.0},
             {"product_id": "PROD002", "quantity": 5, "unit_price": 25.0}
-        ],
-        "description": "Orden válida - Cliente activo con crédito suficiente"
-    },
-    "CUST002": {
-        "order_id": "ORD-002",
-        "customer_id": "CUST002",
-        "items": [
-            {"product_id": "PROD001", "quantity": 5, "unit_price": 1200.0}
-        ],
-        "description": "Orden rechazada - Crédito insuficiente (necesita $6000, tiene $500)"
-    },
-    "CUST003": {
-        "order_id": "ORD-003",
-        "customer_id": "CUST003",
-        "items": [
-            {"product_id": "PROD004", "quantity": 2, "unit_price": 350.0}
-        ],
-        "description": "Orden rechazada - Cliente inactivo"
-    },
-    "CUST004": {
-        "order_id": "ORD-004",
-        "customer_id": "CUST004",
-        "items": [
+        ),
+        description="Orden válida - Cliente activo con crédito suficiente"
+    ),
+    ExampleOrder(
+        order_id="ORD-002",
+        customer_id="CUST002",
+        items=(
+            {"product_id": "PROD001", "quantity": 5, "unit_price": 1200.0},
+        ),
+        description="Orden rechazada - Crédito insuficiente (necesita $6000, tiene $500)"
+    ),
+    ExampleOrder(
+        order_id="ORD-003",
+        customer_id="CUST003",
+        items=(
+            {"product_id": "PROD004", "quantity": 2, "unit_price": 350.0},
+        ),
+        description="Orden rechazada - Cliente inactivo"
+    ),
+    ExampleOrder(
+        order_id="ORD-004",
+        customer_id="CUST004",
+        items=(
             {"product_id": "PROD005", "quantity": 3, "unit_price": 120.0},
             {"product_id": "PROD002", "quantity": 2, "unit_price": 25.0}
-        ],
-        "description": "Orden rechazada - Producto sin stock (PROD005)"
-    },
-    "CUST005": {
-        "order_id": "ORD-005",
-        "customer_id": "CUST005",
-        "items": [
+        ),
+        description="Orden rechazada - Producto sin stock (PROD005)"
+    ),
+    ExampleOrder(
+        order_id="ORD-005",
+        customer_id="CUST005",
+        items=(
             {"product_id": "PROD999", "quantity": 1, "unit_price": 100.0},
             {"product_id": "PROD001", "quantity": 2, "unit_price": 1200.0}
-        ],
-        "description": "Orden rechazada - Producto inexistente (PROD999)"
-    }
+        ),
+        description="Orden rechazada - Producto inexistente (PROD999)"
+    )
+)
+
+
+# Descripción de cada nodo del grafo para el progreso en la CLI
+NODE_LABELS = {
+    "parse_order": "Estructura de la orden",
+    "validate_customer": "Validación de cliente",
+    "validate_items": "Validación de items",
+    "join_validations": "Validaciones combinadas",
+    "check_credit": "Verificación de crédito",
+    "process_order": "Orden procesada",
+    "error_handler": "Manejo de errores"
 }
 
 
@@ -86,6 +125,53 @@ def print_header():
     console.print()
 
 
+# Fábricas de tablas: las columnas son fijas, así que se declaran una sola
+# vez a nivel de módulo y cada llamada solo crea la tabla vacía.
+DETAILS_COLUMNS = (
+    ("Validación", {"style": "cyan", "no_wrap": True}),
+    ("Estado", {"justify": "center"}),
+    ("Detalles", {"style": "dim"})
+)
+
+ITEMS_COLUMNS = (
+    ("Producto", {"style": "cyan"}),
+    ("Nombre", {"style": "white"}),
+    ("Cantidad", {"justify": "right"}),
+    ("Precio Unit.", {"justify": "right"}),
+    ("Total", {"justify": "right", "style": "green"})
+)
+
+SUMMARY_COLUMNS = (
+    ("Order ID", {"style": "cyan"}),
+    ("Customer ID", {"style": "white"}),
+    ("Total", {"justify": "right"}),
+    ("Estado", {"justify": "center"})
+)
+
+
+def _make_table(columns, **table_kwargs) -> Table:
+    """Crea una tabla vacía con las columnas indicadas."""
+    table = Table(**table_kwargs)
+    for header, column_kwargs in columns:
+        table.add_column(header, **column_kwargs)
+    return table
+
+
+def _make_details_table() -> Table:
+    """Crea la tabla de detalles de validación."""
+    return _make_table(DETAILS_COLUMNS, title="Detalles de Validación", box=box.ROUNDED)
+
+
+def _make_items_table() -> Table:
+    """Crea la tabla de items aprobados."""
+    return _make_table(ITEMS_COLUMNS, box=box.SIMPLE)
+
+
+def _make_summary_table() -> Table:
+    """Crea la tabla de resumen de validaciones de ejemplo."""
+    return _make_table(SUMMARY_COLUMNS, title="Resultados", box=box.ROUNDED)
+
+
 def print_validation_result(result: Dict[str, Any], order_data: Dict[str, Any]):
     """
     Imprime el resultado de validación de forma bonita.
@@ -122,10 +208,7 @@ def print_validation_result(result: Dict[str, Any], order_data: Dict[str, Any]):
     console.print(f"\n[bold]{result['message']}[/bold]\n")
     
     # Tabla de validaciones
-    table = Table(title="Detalles de Validación", box=box.ROUNDED)
-    table.add_column("Validación", style="cyan", no_wrap=True)
-    table.add_column("Estado", justify="center")
-    table.add_column("Detalles", style="dim")
+    table = _make_details_table()
     
     # Validación de cliente
     customer_val = result["validation_details"].get("customer", {})
@@ -180,12 +263,7 @@ def print_validation_result(result: Dict[str, Any], order_data: Dict[str, Any]):
     # Detalles de items validados
     if result["approved"] and items_val.get("validated_items"):
         console.print("\n[bold cyan]Items Aprobados:[/bold cyan]")
-        items_table = Table(box=box.SIMPLE)
-        items_table.add_column("Producto", style="cyan")
-        items_table.add_column("Nombre", style="white")
-        items_table.add_column("Cantidad", justify="right")
-        items_table.add_column("Precio Unit.", justify="right")
-        items_table.add_column("Total", justify="right", style="green")
+        items_table = _make_items_table()
         
         for item in items_val["validated_items"]:
             items_table.add_row(
@@ -201,42 +279,64 @@ def print_validation_result(result: Dict[str, Any], order_data: Dict[str, Any]):
     console.print("\n" + "─" * 80 + "\n")
 
 
+async def validate_examples_with_progress(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Valida las órdenes concurrentemente mostrando una tarea de progreso por orden.
+    
+    Args:
+        orders: Órdenes a validar
+        
+    Returns:
+        Resultados en el mismo orden que las órdenes
+    """
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        transient=True
+    ) as progress:
+        tasks = [
+            progress.add_task(f"Validando orden {order['order_id']}...", total=1)
+            for order in orders
+        ]
+        
+        def mark_done(index: int, result: Dict[str, Any]) -> None:
+            progress.update(
+                tasks[index],
+                completed=1,
+                description=f"Orden {orders[index]['order_id']}: {result['status']}"
+            )
+        
+        return await validate_orders_batch_async(orders, on_result=mark_done)
+
+
 def run_example_validations():
     """Ejecuta validaciones de ejemplo con los 5 casos de prueba."""
     console.print("[bold cyan]Ejecutando Validaciones de Ejemplo[/bold cyan]\n")
     
+    orders = [
+        {
+            "order_id": example.order_id,
+            "customer_id": example.customer_id,
+            "items": list(example.items)
+        }
+        for example in EXAMPLE_ORDERS
+    ]
+    
+    results = asyncio.run(validate_examples_with_progress(orders))
+    
     results_summary = []
     
-    for customer_key, order_data in EXAMPLE_ORDERS.items():
-        console.print(f"[bold yellow]Caso de Prueba:[/bold yellow] {order_data['description']}")
-        
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-            transient=True
-        ) as progress:
-            task = progress.add_task(
-                f"Validando orden {order_data['order_id']}...",
-                total=None
-            )
-            
-            # Ejecutar validación
-            result = validate_order(
-                order_id=order_data["order_id"],
-                customer_id=order_data["customer_id"],
-                items=order_data["items"]
-            )
-            
-            progress.update(task, completed=True)
+    for example, order_data, result in zip(EXAMPLE_ORDERS, orders, results):
+        console.print(f"[bold yellow]Caso de Prueba:[/bold yellow] {example.description}")
         
         # Mostrar resultado
         print_validation_result(result, order_data)
         
         # Guardar resumen
         results_summary.append({
-            "order_id": order_data["order_id"],
-            "customer_id": order_data["customer_id"],
+            "order_id": example.order_id,
+            "customer_id": example.customer_id,
             "approved": result["approved"],
             "total": result["total_amount"]
         })
@@ -244,11 +344,7 @@ def run_example_validations():
     # Mostrar resumen final
     console.print("[bold cyan]Resumen de Validaciones[/bold cyan]\n")
     
-    summary_table = Table(title="Resultados", box=box.ROUNDED)
-    summary_table.add_column("Order ID", style="cyan")
-    summary_table.add_column("Customer ID", style="white")
-    summary_table.add_column("Total", justify="right")
-    summary_table.add_column("Estado", justify="center")
+    summary_table = _make_summary_table()
     
     approved_count = 0
     rejected_count = 0
@@ -273,6 +369,46 @@ def run_example_validations():
     console.print(f"\n[green]Aprobadas: {approved_count}[/green] | [red]Rechazadas: {rejected_count}[/red]\n")
 
 
+async def stream_validation(
+    order_id: str,
+    customer_id: str,
+    items: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Valida una orden mostrando el progreso de cada nodo del grafo.
+    
+    Args:
+        order_id: ID de la orden
+        customer_id: ID del cliente
+        items: Items de la orden
+        
+    Returns:
+        Resultado final de la validación
+    """
+    result: Dict[str, Any] = {}
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        transient=True
+    ) as progress:
+        task = progress.add_task(f"Validando orden {order_id}...", total=None)
+        
+        async for node_name, update in validate_order_stream(order_id, customer_id, items):
+            if node_name == END:
+                result = update
+                continue
+            
+            label = NODE_LABELS.get(node_name, node_name)
+            progress.console.print(f"  [dim]✓ {label}[/dim]")
+            progress.update(task, description=f"Validando orden {order_id}... ({label})")
+        
+        progress.update(task, completed=True)
+    
+    return result
+
+
 def validate_custom_order():
     """Permite al usuario ingresar una orden personalizada para validar."""
     console.print("[bold cyan]Validación de Orden Personalizada[/bold cyan]\n")
@@ -319,23 +455,9 @@ def validate_custom_order():
         console.print("[yellow]Validación cancelada.[/yellow]")
         return
     
-    # Ejecutar validación
+    # Ejecutar validación mostrando cada paso a medida que termina
     console.print()
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True
-    ) as progress:
-        task = progress.add_task(f"Validando orden {order_id}...", total=None)
-        
-        result = validate_order(
-            order_id=order_id,
-            customer_id=customer_id,
-            items=items
-        )
-        
-        progress.update(task, completed=True)
+    result = asyncio.run(stream_validation(order_id, customer_id, items))
     
     # Mostrar resultado
     order_data = {
@@ -0,0 +1,225 @@
+"""
+Detección de llamadas repetidas a herramientas.
+Evita que un agente vuelva a ejecutar la misma validación en bucle.
+
+El limitador solo registra llamadas dentro de ToolLimiter.session(): quien
+ejecute un agente con herramientas envueltas debe abrir una sesión por
+cada ejecución del agente. Fuera de una sesión las herramientas se
+ejecutan sin cambios.
+"""
+
+import copy
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, FrozenSet, Iterator, Optional
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import patch_config
+from langchain_core.tools import BaseTool, StructuredTool
+from loguru import logger
+
+# Límites por defecto de llamadas similares por herramienta
+DEFAULT_SOFT_LIMIT = 3
+DEFAULT_HARD_LIMIT = 8
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+# Llamadas recordadas por herramienta dentro de una sesión
+DEFAULT_HISTORY_SIZE = 32
+
+
+@dataclass(frozen=True, slots=True)
+class LimitDecision:
+    """Resultado de verificar una llamada contra el limitador."""
+    skip: bool
+    result: Optional[Any] = None
+    similar_calls: int = 0
+
+
+@dataclass(slots=True)
+class _CallRecord:
+    """Llamada previa registrada para una herramienta."""
+    key: str
+    tokens: FrozenSet[str]
+    result: Any
+
+
+def _stable_repr(value: Any) -> str:
+    """Representación determinista de un argumento para compararlo."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _arg_tokens(args: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    Descompone los argumentos en tokens para calcular similitud.
+
+    Las listas aportan un token por elemento, de modo que dos órdenes
+    que difieren en un solo item siguen siendo similares.
+    """
+    tokens = set()
+    for name, value in args.items():
+        if isinstance(value, (list, tuple)):
+            tokens.update(f"{name}:{_stable_repr(element)}" for element in value)
+        else:
+            tokens.add(f"{name}={_stable_repr(value)}")
+    return frozenset(tokens)
+
+
+def _jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    """Similitud de Jaccard entre dos conjuntos de tokens."""
+    if not left and not right:
+        return 1.0
+    return len(left & right) / len(left | right)
+
+
+class ToolLimiter:
+    """
+    Detecta llamadas repetidas o casi idénticas a las herramientas.
+
+    - Hasta soft_limit llamadas similares se ejecutan normalmente.
+    - Desde soft_limit, una llamada con argumentos idénticos a una previa
+      devuelve una copia del resultado anterior sin ejecutar la herramienta.
+    - Desde hard_limit se registra un error por posible bucle. Las llamadas
+      no idénticas se siguen ejecutando: el limitador nunca reemplaza el
+      resultado de una herramienta por otro distinto.
+
+    Dos llamadas son similares si la similitud de Jaccard de sus
+    argumentos supera similarity_threshold. El historial vive solo dentro
+    de session(), acotado a history_size llamadas por herramienta; fuera
+    de una sesión las herramientas se ejecutan sin registrar nada.
+    """
+
+    def __init__(
+        self,
+        soft_limit: int = DEFAULT_SOFT_LIMIT,
+        hard_limit: int = DEFAULT_HARD_LIMIT,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        history_size: int = DEFAULT_HISTORY_SIZE
+    ):
+        if not 0 < soft_limit <= hard_limit:
+            raise ValueError("Se requiere 0 < soft_limit <= hard_limit")
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self.similarity_threshold = similarity_threshold
+        self.history_size = history_size
+        self._session: ContextVar[Optional[Dict[str, Deque[_CallRecord]]]] = ContextVar(
+            f"tool_limiter_session_{id(self)}", default=None
+        )
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """
+        Abre una sesión del agente con historial de llamadas propio.
+
+        El historial se descarta al salir. Las tareas y hilos que heredan
+        el contexto comparten el historial de la sesión.
+        """
+        token = self._session.set({})
+        try:
+            yield
+        finally:
+            self._session.reset(token)
+
+    def check(self, tool_name: str, args: Dict[str, Any]) -> LimitDecision:
+        """
+        Decide si una llamada debe ejecutarse o servirse desde el historial.
+
+        Args:
+            tool_name: Nombre de la herramienta
+            args: Argumentos de la llamada
+
+        Returns:
+            LimitDecision con skip=True y el resultado a devolver si la
+            llamada repite exactamente una anterior
+        """
+        history = self._session.get()
+        if history is None:
+            return LimitDecision(skip=False)
+
+        key = _stable_repr(args)
+        tokens = _arg_tokens(args)
+
+        with self._lock:
+            similar = [
+                record for record in history.get(tool_name, ())
+                if _jaccard(tokens, record.tokens) > self.similarity_threshold
+            ]
+
+        similar_calls = len(similar)
+        if similar_calls < self.soft_limit:
+            return LimitDecision(skip=False, similar_calls=similar_calls)
+
+        if similar_calls >= self.hard_limit:
+            logger.error("Posible bucle: {} llamadas similares a {}", similar_calls, tool_name)
+
+        for record in reversed(similar):
+            if record.key == key:
+                logger.warning("Llamada repetida a {}: se reutiliza el resultado previo", tool_name)
+                return LimitDecision(
+                    skip=True, result=copy.deepcopy(record.result), similar_calls=similar_calls
+                )
+
+        logger.warning("{} llamadas similares a {}", similar_calls, tool_name)
+        return LimitDecision(skip=False, similar_calls=similar_calls)
+
+    def record(self, tool_name: str, args: Dict[str, Any], result: Any) -> None:
+        """Registra una llamada ejecutada y su resultado en la sesión actual."""
+        history = self._session.get()
+        if history is None:
+            return
+        call = _CallRecord(key=_stable_repr(args), tokens=_arg_tokens(args), result=copy.deepcopy(result))
+        with self._lock:
+            calls = history.get(tool_name)
+            if calls is None:
+                calls = history[tool_name] = deque(maxlen=self.history_size)
+            calls.append(call)
+
+    def reset(self) -> None:
+        """Olvida el historial de la sesión actual."""
+        history = self._session.get()
+        if history is not None:
+            with self._lock:
+                history.clear()
+
+    def wrap(self, target: BaseTool) -> StructuredTool:
+        """
+        Envuelve una herramienta para que pase por el limitador.
+        
+        La configuración y los callbacks de la ejecución externa se
+        reenvían a la herramienta original, y ainvoke usa su ruta async.
+        
+        Args:
+            target: Herramienta original
+            
+        Returns:
+            Herramienta con el mismo nombre, descripción y esquema
+        """
+        tool_name = target.name
+        
+        def limited(config: RunnableConfig, callbacks: Callbacks = None, **kwargs: Any) -> Any:
+            decision = self.check(tool_name, kwargs)
+            if decision.skip:
+                return decision.result
+            result = target.invoke(kwargs, config=patch_config(config, callbacks=callbacks))
+            self.record(tool_name, kwargs, result)
+            return result
+        
+        async def alimited(config: RunnableConfig, callbacks: Callbacks = None, **kwargs: Any) -> Any:
+            decision = self.check(tool_name, kwargs)
+            if decision.skip:
+                return decision.result
+            result = await target.ainvoke(kwargs, config=patch_config(config, callbacks=callbacks))
+            self.record(tool_name, kwargs, result)
+            return result
+        
+        return StructuredTool.from_function(
+            func=limited,
+            coroutine=alimited,
+            name=tool_name,
+            description=target.description,
+            args_schema=target.args_schema
+        )
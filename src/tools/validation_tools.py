@@ -1,14 +1,38 @@
 """
 Herramientas de validación para órdenes usando LangChain.
 Incluye validación de clientes, crédito y items.
+
+VALIDATION_TOOLS son las herramientas para enlazar a un agente LLM, envueltas
+por TOOL_LIMITER. El limitador solo actúa dentro de una sesión, así que cada
+ejecución del agente debe abrir la suya:
+
+    with TOOL_LIMITER.session():
+        agent.invoke(...)
 """
 
-from typing import Dict, List, Any, Optional
+import logging
+import math
+from types import MappingProxyType
+from typing import Dict, List, Any, Tuple
 from langchain_core.tools import tool
 from loguru import logger
+from pydantic import BaseModel, Field
+
+from ._limiter import ToolLimiter
+
+# Logger estándar para las rutas por item: descarta los mensajes filtrados
+# sin formatearlos ni inspeccionar el stack. El resto del módulo usa loguru
+item_log = logging.getLogger(__name__)
 
-# Datos mock de clientes
-MOCK_CUSTOMERS = {
+def _freeze_records(records: Dict[str, Dict[str, Any]]) -> MappingProxyType:
+    """Tabla por ID de solo lectura, incluyendo cada registro."""
+    return MappingProxyType({
+        record_id: MappingProxyType(record) for record_id, record in records.items()
+    })
+
+
+# Datos mock de clientes (solo lectura)
+MOCK_CUSTOMERS = _freeze_records({
     "CUST001": {
         "id": "CUST001",
         "name": "Acme Corporation",
@@ -49,10 +73,22 @@ MOCK_CUSTOMERS = {
         "credit_limit": 20000.0,
         "current_balance": 15000.0
     }
-}
+})
+
+# Índice de clientes con campos derivados precalculados, para que las
+# herramientas no recalculen el crédito disponible en cada llamada.
+# También de solo lectura: las verificaciones de crédito dependen de él
+_CUSTOMER_INDEX = _freeze_records({
+    customer_id: {
+        **customer,
+        "available_credit": customer["credit_limit"] - customer["current_balance"],
+        "is_active": customer["status"] == "active"
+    }
+    for customer_id, customer in MOCK_CUSTOMERS.items()
+})
 
-# Datos mock de productos/items
-MOCK_PRODUCTS = {
+# Datos mock de productos/items (solo lectura)
+MOCK_PRODUCTS = _freeze_records({
     "PROD001": {
         "id": "PROD001",
         "name": "Laptop Pro 15",
@@ -95,10 +131,83 @@ MOCK_PRODUCTS = {
         "stock": 75,
         "category": "electronics"
     }
-}
+})
+
+
+# Plantillas inmutables con los campos fijos de cada resultado; las
+# herramientas solo completan los campos variables (mensaje, datos)
+_CUSTOMER_MISSING = MappingProxyType({
+    "valid": False,
+    "exists": False,
+    "active": False,
+    "customer_data": None
+})
+_CUSTOMER_INACTIVE = MappingProxyType({
+    "valid": False,
+    "exists": True,
+    "active": False
+})
+_CUSTOMER_ACTIVE = MappingProxyType({
+    "valid": True,
+    "exists": True,
+    "active": True
+})
+_CREDIT_CUSTOMER_MISSING = MappingProxyType({
+    "has_credit": False,
+    "credit_limit": 0.0,
+    "current_balance": 0.0,
+    "available_credit": 0.0
+})
+
+
+# Esquemas de entrada explícitos: se construyen una sola vez al importar y
+# evitan que @tool derive el esquema a partir de las anotaciones
+class CustomerIdInput(BaseModel):
+    """Entrada de validate_customer_exists."""
+    customer_id: str = Field(description="ID único del cliente a validar")
+
+
+class CreditCheckInput(BaseModel):
+    """Entrada de check_customer_credit y validate_customer_and_credit."""
+    customer_id: str = Field(description="ID único del cliente")
+    order_amount: float = Field(description="Monto total de la orden")
+
+
+class OrderItemsInput(BaseModel):
+    """Entrada de validate_order_items."""
+    items: List[Dict[str, Any]] = Field(
+        description="Items de la orden con product_id, quantity y unit_price (opcional)"
+    )
+    fail_fast: bool = Field(
+        default=False,
+        description="Detenerse en el primer item inválido si solo importa si la orden es válida"
+    )
 
 
-@tool
+class OrdersBatchInput(BaseModel):
+    """Entrada de validate_orders_batch."""
+    orders: List[Dict[str, Any]] = Field(
+        description="Órdenes con order_id (opcional), customer_id e items"
+    )
+
+
+def _get_customer(customer_id: str) -> Dict[str, Any]:
+    """
+    Obtiene el registro indexado de un cliente con una sola búsqueda.
+    
+    Args:
+        customer_id: ID único del cliente
+        
+    Returns:
+        Registro del cliente con los campos derivados del índice
+        
+    Raises:
+        KeyError: si el cliente no existe
+    """
+    return _CUSTOMER_INDEX[customer_id]
+
+
+@tool(args_schema=CustomerIdInput)
 def validate_customer_exists(customer_id: str) -> Dict[str, Any]:
     """
     Valida si un cliente existe en el sistema y está activo.
@@ -114,53 +223,42 @@ def validate_customer_exists(customer_id: str) -> Dict[str, Any]:
         - customer_data: datos del cliente si existe
         - message: mensaje descriptivo del resultado
     """
-    logger.info(f"Validando existencia del cliente: {customer_id}")
+    return _validate_customer_exists_impl(customer_id)
+
+
+def _validate_customer_exists_impl(customer_id: str) -> Dict[str, Any]:
+    """Implementación de validate_customer_exists, compartida con las herramientas combinadas."""
+    logger.info("Validando existencia del cliente: {}", customer_id)
     
     if not customer_id:
         logger.warning("ID de cliente vacío proporcionado")
-        return {
-            "valid": False,
-            "exists": False,
-            "active": False,
-            "customer_data": None,
-            "message": "ID de cliente no proporcionado"
-        }
+        return {**_CUSTOMER_MISSING, "message": "ID de cliente no proporcionado"}
     
-    customer = MOCK_CUSTOMERS.get(customer_id)
+    try:
+        customer = _get_customer(customer_id)
+    except KeyError:
+        logger.warning("Cliente no encontrado: {}", customer_id)
+        return {**_CUSTOMER_MISSING, "message": f"Cliente {customer_id} no existe en el sistema"}
     
-    if not customer:
-        logger.warning(f"Cliente no encontrado: {customer_id}")
+    if not customer["is_active"]:
+        logger.warning("Cliente inactivo: {}", customer_id)
         return {
-            "valid": False,
-            "exists": False,
-            "active": False,
-            "customer_data": None,
-            "message": f"Cliente {customer_id} no existe en el sistema"
-        }
-    
-    is_active = customer.get("status") == "active"
-    
-    if not is_active:
-        logger.warning(f"Cliente inactivo: {customer_id}")
-        return {
-            "valid": False,
-            "exists": True,
-            "active": False,
-            "customer_data": customer,
+            **_CUSTOMER_INACTIVE,
+            "customer_data": dict(MOCK_CUSTOMERS[customer_id]),
             "message": f"Cliente {customer_id} existe pero está inactivo"
         }
     
-    logger.info(f"Cliente válido: {customer_id} - {customer['name']}")
+    logger.info("Cliente válido: {} - {}", customer_id, customer["name"])
+    # Copia del registro público: los campos derivados del índice son
+    # internos y quien reciba el resultado no debe poder modificar las tablas
     return {
-        "valid": True,
-        "exists": True,
-        "active": True,
-        "customer_data": customer,
+        **_CUSTOMER_ACTIVE,
+        "customer_data": dict(MOCK_CUSTOMERS[customer_id]),
         "message": f"Cliente {customer_id} válido y activo"
     }
 
 
-@tool
+@tool(args_schema=CreditCheckInput)
 def check_customer_credit(customer_id: str, order_amount: float) -> Dict[str, Any]:
     """
     Verifica si un cliente tiene crédito suficiente para una orden.
@@ -178,29 +276,32 @@ def check_customer_credit(customer_id: str, order_amount: float) -> Dict[str, An
         - required_amount: monto requerido para la orden
         - message: mensaje descriptivo del resultado
     """
-    logger.info(f"Verificando crédito para cliente {customer_id}, monto: ${order_amount:.2f}")
-    
-    customer = MOCK_CUSTOMERS.get(customer_id)
+    # Los montos se manejan con precisión de centavos
+    return _check_customer_credit_impl(customer_id, round(order_amount, 2))
+
+
+def _check_customer_credit_impl(customer_id: str, order_amount: float) -> Dict[str, Any]:
+    """Implementación de check_customer_credit, compartida con las herramientas combinadas."""
+    logger.info("Verificando crédito para cliente {}, monto: ${:.2f}", customer_id, order_amount)
     
-    if not customer:
-        logger.error(f"Cliente no encontrado al verificar crédito: {customer_id}")
+    try:
+        customer = _get_customer(customer_id)
+    except KeyError:
+        logger.error("Cliente no encontrado al verificar crédito: {}", customer_id)
         return {
-            "has_credit": False,
-            "credit_limit": 0.0,
-            "current_balance": 0.0,
-            "available_credit": 0.0,
+            **_CREDIT_CUSTOMER_MISSING,
             "required_amount": order_amount,
             "message": f"Cliente {customer_id} no encontrado"
         }
     
-    credit_limit = customer.get("credit_limit", 0.0)
-    current_balance = customer.get("current_balance", 0.0)
-    available_credit = credit_limit - current_balance
+    credit_limit = customer["credit_limit"]
+    current_balance = customer["current_balance"]
+    available_credit = customer["available_credit"]
     
     has_sufficient_credit = available_credit >= order_amount
     
     if has_sufficient_credit:
-        logger.info(f"Crédito suficiente para {customer_id}: ${available_credit:.2f} disponible")
+        logger.info("Crédito suficiente para {}: ${:.2f} disponible", customer_id, available_credit)
         return {
             "has_credit": True,
             "credit_limit": credit_limit,
@@ -211,7 +312,7 @@ def check_customer_credit(customer_id: str, order_amount: float) -> Dict[str, An
         }
     else:
         deficit = order_amount - available_credit
-        logger.warning(f"Crédito insuficiente para {customer_id}: falta ${deficit:.2f}")
+        logger.warning("Crédito insuficiente para {}: falta ${:.2f}", customer_id, deficit)
         return {
             "has_credit": False,
             "credit_limit": credit_limit,
@@ -222,8 +323,117 @@ def check_customer_credit(customer_id: str, order_amount: float) -> Dict[str, An
         }
 
 
-@tool
-def validate_order_items(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+@tool(args_schema=CreditCheckInput)
+def validate_customer_and_credit(customer_id: str, order_amount: float) -> Dict[str, Any]:
+    """
+    Valida el cliente y su crédito para una orden en una sola llamada.
+    
+    Equivale a validate_customer_exists seguido de check_customer_credit;
+    el crédito solo se verifica si el cliente es válido.
+    
+    Args:
+        customer_id: ID único del cliente
+        order_amount: Monto total de la orden
+        
+    Returns:
+        Dict con información de validación:
+        - valid: bool indicando si el cliente es válido y tiene crédito
+        - customer: resultado de validate_customer_exists
+        - credit: resultado de check_customer_credit ({} si no se verificó)
+    """
+    customer_result = _validate_customer_exists_impl(customer_id)
+    if not customer_result["valid"]:
+        return {"valid": False, "customer": customer_result, "credit": {}}
+    
+    credit_result = _check_customer_credit_impl(customer_id, round(order_amount, 2))
+    return {
+        "valid": credit_result["has_credit"],
+        "customer": customer_result,
+        "credit": credit_result
+    }
+
+
+def _validate_item(item: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Valida un item: existencia, cantidad, stock y precio, en ese orden.
+    
+    Un precio ausente (None) no se valida; uno no numérico o NaN nunca
+    coincide con el precio real. Cantidades no numéricas o NaN fallan.
+    
+    Args:
+        item: Item de la orden
+        
+    Returns:
+        Tupla (es_válido, detalle): el item validado con su total, o el
+        motivo de la primera verificación que falla
+    """
+    get = item.get
+    product_id = get("product_id")
+    quantity = get("quantity", 0)
+    provided_price = get("unit_price")
+    
+    # Validar que el producto existe
+    product = MOCK_PRODUCTS.get(product_id)
+    if product is None:
+        item_log.warning("Producto no encontrado: %s", product_id)
+        return False, {
+            "product_id": product_id,
+            "quantity": quantity,
+            "reason": f"Producto {product_id} no existe en el catálogo"
+        }
+    
+    # Validar cantidad (NaN también es inválido)
+    if not isinstance(quantity, (int, float)) or not quantity > 0:
+        item_log.warning("Cantidad inválida para %s: %s", product_id, quantity)
+        return False, {
+            "product_id": product_id,
+            "quantity": quantity,
+            "reason": "Cantidad debe ser mayor a 0"
+        }
+    
+    # Validar stock disponible
+    available_stock = product["stock"]
+    if quantity > available_stock:
+        item_log.warning("Stock insuficiente para %s: solicitado %s, disponible %s", product_id, quantity, available_stock)
+        return False, {
+            "product_id": product_id,
+            "quantity": quantity,
+            "available_stock": available_stock,
+            "reason": f"Stock insuficiente. Solicitado: {quantity}, Disponible: {available_stock}"
+        }
+    
+    # Validar precio si se proporcionó
+    actual_price = product["price"]
+    if provided_price is not None and not (
+        isinstance(provided_price, (int, float)) and abs(provided_price - actual_price) <= 0.01
+    ):
+        item_log.warning("Precio incorrecto para %s: proporcionado %s, actual $%.2f", product_id, provided_price, actual_price)
+        if not isinstance(provided_price, (int, float)):
+            reason = f"Precio incorrecto. Proporcionado: {provided_price}, Actual: ${actual_price:.2f}"
+        else:
+            reason = f"Precio incorrecto. Proporcionado: ${provided_price:.2f}, Actual: ${actual_price:.2f}"
+        return False, {
+            "product_id": product_id,
+            "quantity": quantity,
+            "provided_price": provided_price,
+            "actual_price": actual_price,
+            "reason": reason
+        }
+    
+    item_total = actual_price * quantity
+    item_log.debug("Item válido: %s - %s, total: $%.2f", product_id, product["name"], item_total)
+    return True, {
+        "product_id": product_id,
+        "product_name": product["name"],
+        "quantity": quantity,
+        "unit_price": actual_price,
+        "item_total": item_total,
+        "category": product["category"]
+    }
+
+
+@tool(args_schema=OrderItemsInput)
+def validate_order_items(items: List[Dict[str, Any]], fail_fast: bool = False) -> Dict[str, Any]:
     """
     Valida los items de una orden verificando existencia, stock y precios.
     
@@ -232,6 +442,9 @@ def validate_order_items(items: List[Dict[str, Any]]) -> Dict[str, Any]:
             - product_id: ID del producto
             - quantity: cantidad solicitada
             - unit_price: precio unitario (opcional, se valida contra precio real)
+        fail_fast: si es True, devuelve solo el primer item inválido en
+            el orden recibido, sin armar el detalle de los demás; usar
+            cuando solo importa si la orden es válida o no
             
     Returns:
         Dict con información de validación:
@@ -240,98 +453,133 @@ def validate_order_items(items: List[Dict[str, Any]]) -> Dict[str, Any]:
         - validated_items: lista de items validados con detalles
         - invalid_items: lista de items inválidos con razones
         - message: mensaje descriptivo del resultado
+        Con fail_fast=True y algún item inválido, en su lugar:
+        - valid: False
+        - total_amount: 0.0
+        - first_invalid: detalle del primer item inválido
+        - message: mensaje descriptivo del resultado
     """
-    logger.info(f"Validando {len(items)} items de la orden")
+    logger.info("Validando {} items de la orden", len(items))
     
     if not items:
-        logger.warning("Lista de items vacía")
-        return {
-            "valid": False,
-            "total_amount": 0.0,
-            "validated_items": [],
-            "invalid_items": [],
-            "message": "No se proporcionaron items en la orden"
-        }
+        return _empty_items_result()
     
-    validated_items = []
-    invalid_items = []
-    total_amount = 0.0
+    return _build_items_result(items, fail_fast=fail_fast)
+
+
+def _first_invalid_result(first_invalid: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultado abreviado de fail_fast con el primer item inválido."""
+    return {
+        "valid": False,
+        "total_amount": 0.0,
+        "first_invalid": first_invalid,
+        "message": f"Validación fallida: {first_invalid['reason']}"
+    }
+
+
+@tool(args_schema=OrdersBatchInput)
+def validate_orders_batch(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Valida varias órdenes en una sola llamada (cliente, items y crédito).
     
-    for idx, item in enumerate(items):
-        product_id = item.get("product_id")
-        quantity = item.get("quantity", 0)
-        provided_price = item.get("unit_price")
-        
-        logger.debug(f"Validando item {idx + 1}: {product_id}, cantidad: {quantity}")
-        
-        # Validar que el producto existe
-        product = MOCK_PRODUCTS.get(product_id)
-        if not product:
-            logger.warning(f"Producto no encontrado: {product_id}")
-            invalid_items.append({
-                "product_id": product_id,
-                "quantity": quantity,
-                "reason": f"Producto {product_id} no existe en el catálogo"
-            })
-            continue
-        
-        # Validar cantidad
-        if quantity <= 0:
-            logger.warning(f"Cantidad inválida para {product_id}: {quantity}")
-            invalid_items.append({
-                "product_id": product_id,
-                "quantity": quantity,
-                "reason": f"Cantidad debe ser mayor a 0"
-            })
-            continue
-        
-        # Validar stock disponible
-        available_stock = product.get("stock", 0)
-        if quantity > available_stock:
-            logger.warning(f"Stock insuficiente para {product_id}: solicitado {quantity}, disponible {available_stock}")
-            invalid_items.append({
-                "product_id": product_id,
-                "quantity": quantity,
-                "available_stock": available_stock,
-                "reason": f"Stock insuficiente. Solicitado: {quantity}, Disponible: {available_stock}"
-            })
-            continue
-        
-        # Validar precio si se proporciona
-        actual_price = product.get("price", 0.0)
-        if provided_price is not None and abs(provided_price - actual_price) > 0.01:
-            logger.warning(f"Precio incorrecto para {product_id}: proporcionado ${provided_price:.2f}, actual ${actual_price:.2f}")
-            invalid_items.append({
-                "product_id": product_id,
-                "quantity": quantity,
-                "provided_price": provided_price,
-                "actual_price": actual_price,
-                "reason": f"Precio incorrecto. Proporcionado: ${provided_price:.2f}, Actual: ${actual_price:.2f}"
-            })
-            continue
+    Preferir esta herramienta sobre las individuales cuando haya más de
+    una orden pendiente: se resuelven todas en una sola llamada.
+    
+    Args:
+        orders: Lista de órdenes con estructura:
+            - order_id: ID de la orden (opcional)
+            - customer_id: ID del cliente
+            - items: lista de items (igual que en validate_order_items)
+            
+    Returns:
+        Lista con un resultado por orden, en el mismo orden de entrada:
+        - order_id: ID de la orden
+        - valid: bool indicando si cliente, items y crédito son válidos
+        - customer: resultado de validate_customer_exists
+        - items: resultado de validate_order_items
+        - credit: resultado de check_customer_credit ({} si no se verificó)
+    """
+    logger.info("Validando lote de {} órdenes", len(orders))
+    
+    results = []
+    for order in orders:
+        order_items = order.get("items") or []
+        customer_result = _validate_customer_exists_impl(order.get("customer_id", ""))
+        items_result = _build_items_result(order_items) if order_items else _empty_items_result()
         
-        # Item válido
-        item_total = actual_price * quantity
-        total_amount += item_total
+        credit_result: Dict[str, Any] = {}
+        if customer_result["valid"] and items_result["valid"]:
+            credit_result = _check_customer_credit_impl(
+                order["customer_id"], round(items_result["total_amount"], 2)
+            )
         
-        validated_items.append({
-            "product_id": product_id,
-            "product_name": product.get("name"),
-            "quantity": quantity,
-            "unit_price": actual_price,
-            "item_total": item_total,
-            "category": product.get("category")
+        results.append({
+            "order_id": order.get("order_id"),
+            "valid": bool(customer_result["valid"] and items_result["valid"] and credit_result.get("has_credit")),
+            "customer": customer_result,
+            "items": items_result,
+            "credit": credit_result
         })
+    
+    logger.opt(lazy=True).info(
+        "Lote validado: {} de {} órdenes válidas",
+        lambda: sum(r["valid"] for r in results), lambda: len(results)
+    )
+    return results
+
+
+def _empty_items_result() -> Dict[str, Any]:
+    """Resultado de validación para una orden sin items."""
+    logger.warning("Lista de items vacía")
+    return {
+        "valid": False,
+        "total_amount": 0.0,
+        "validated_items": [],
+        "invalid_items": [],
+        "message": "No se proporcionaron items en la orden"
+    }
+
+
+def _build_items_result(items: List[Dict[str, Any]], fail_fast: bool = False) -> Dict[str, Any]:
+    """
+    Valida los items en una sola pasada y arma el resultado.
+    
+    Args:
+        items: Items de la orden (no vacía)
+        fail_fast: devolver el resultado abreviado en el primer item
+            inválido, sin leer los siguientes
         
-        logger.debug(f"Item válido: {product_id} - {product.get('name')}, total: ${item_total:.2f}")
+    Returns:
+        Dict con el mismo esquema que validate_order_items
+    """
+    validated_items = []
+    invalid_items = []
+    valid_totals = []
+    add_valid = validated_items.append
+    add_invalid = invalid_items.append
+    add_total = valid_totals.append
+    validate_item = _validate_item
     
+    for item in items:
+        is_valid_item, detail = validate_item(item)
+        if is_valid_item:
+            add_valid(detail)
+            add_total(detail["item_total"])
+        elif fail_fast:
+            return _first_invalid_result(detail)
+        else:
+            add_invalid(detail)
+    
+    # Suma exacta redondeada a centavos: órdenes equivalentes producen el
+    # mismo total y los mismos mensajes sin importar el orden de los items
+    total_amount = round(math.fsum(valid_totals), 2)
     is_valid = len(invalid_items) == 0 and len(validated_items) > 0
     
     if is_valid:
-        logger.info(f"Todos los items son válidos. Total: ${total_amount:.2f}")
+        logger.info("Todos los items son válidos. Total: ${:.2f}", total_amount)
         message = f"Todos los {len(validated_items)} items son válidos. Total: ${total_amount:.2f}"
     else:
-        logger.warning(f"Validación fallida: {len(invalid_items)} items inválidos")
+        logger.warning("Validación fallida: {} items inválidos", len(invalid_items))
         message = f"Validación fallida: {len(invalid_items)} items inválidos de {len(items)} totales"
     
     return {
@@ -343,9 +591,25 @@ def validate_order_items(items: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
-# Lista de todas las herramientas para fácil importación
+# Limitador de llamadas repetidas para las herramientas expuestas al agente.
+# Solo actúa dentro de una sesión: `with TOOL_LIMITER.session(): ...`
+TOOL_LIMITER = ToolLimiter()
+
+
+def reset_tool_limiter() -> None:
+    """Olvida las llamadas registradas en la sesión actual del limitador."""
+    TOOL_LIMITER.reset()
+
+
+# Lista de todas las herramientas para fácil importación, envueltas por el
+# limitador para servir repeticiones exactas dentro de una sesión
 VALIDATION_TOOLS = [
-    validate_customer_exists,
-    check_customer_credit,
-    validate_order_items
+    TOOL_LIMITER.wrap(validation_tool)
+    for validation_tool in (
+        validate_customer_exists,
+        check_customer_credit,
+        validate_customer_and_credit,
+        validate_order_items,
+        validate_orders_batch
+    )
 ]
\ No newline at end of file
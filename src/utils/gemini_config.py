@@ -3,6 +3,7 @@ Configuración de Google Gemini para el proyecto
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from loguru import logger
@@ -11,10 +12,48 @@ from loguru import logger
 load_dotenv()
 
 
+def configure_llm_cache() -> bool:
+    """
+    Instala una caché de respuestas del LLM para todo el proceso (opcional).
+    
+    No se instala al importar el módulo: hay que llamar a esta función de
+    forma explícita. Con temperature=0 prompts idénticos se sirven desde
+    SQLite sin volver a llamar a la API. La caché es global, así que
+    también congela la primera respuesta de los LLM con temperature > 0
+    (p. ej. get_gemini_for_analysis).
+    
+    Variables de entorno:
+        LLM_CACHE: "1" habilita la caché; sin definir o con cualquier otro
+                   valor no se instala nada (llamadas reales)
+        LLM_CACHE_PATH: ruta del archivo SQLite (por defecto .langchain.db)
+    
+    Returns:
+        True si la caché quedó instalada
+    """
+    if os.getenv("LLM_CACHE") != "1":
+        logger.info("Caché de LLM deshabilitada (LLM_CACHE=1 para habilitarla)")
+        return False
+    
+    # Importación diferida: langchain_community es lento de importar y
+    # solo se necesita cuando la caché está habilitada
+    from langchain_community.cache import SQLiteCache
+    from langchain_core.globals import set_llm_cache
+    
+    database_path = os.getenv("LLM_CACHE_PATH", ".langchain.db")
+    set_llm_cache(SQLiteCache(database_path=database_path))
+    logger.info("Caché de LLM habilitada en {}", database_path)
+    return True
+
+
+@lru_cache(maxsize=8)
 def get_gemini_llm(model: str = "gemini-1.5-flash", temperature: float = 0):
     """
     Obtiene una instancia configurada de Gemini
     
+    Se reutiliza una única instancia por combinación (model, temperature).
+    Si falta la API key se lanza ValueError en cada llamada, ya que las
+    excepciones no se cachean.
+    
     Args:
         model: Nombre del modelo de Gemini a usar
                - gemini-1.5-pro: Más capaz, más caro
@@ -33,7 +72,7 @@ def get_gemini_llm(model: str = "gemini-1.5-flash", temperature: float = 0):
             "Obtén tu clave en: https://makersuite.google.com/app/apikey"
         )
     
-    logger.info(f"Inicializando Gemini con modelo: {model}")
+    logger.info("Inicializando Gemini con modelo: {}", model)
     
     llm = ChatGoogleGenerativeAI(
         model=model,
@@ -60,6 +99,7 @@ def get_gemini_for_analysis():
 if __name__ == "__main__":
     from langchain_core.messages import HumanMessage
     
+    configure_llm_cache()
     llm = get_gemini_for_validation()
     
     # Test simple
@@ -3,6 +3,7 @@ Script para probar la configuración de Gemini
 Ejecutar: python test_gemini.py
 """
 
+import asyncio
 import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -11,8 +12,8 @@ from langchain_core.messages import HumanMessage, SystemMessage
 # Cargar variables de entorno
 load_dotenv()
 
-def test_gemini_connection():
-    """Prueba la conexión con Gemini"""
+async def check_gemini_connection():
+    """Prueba la conexión con Gemini (ambos prompts se envían en paralelo)"""
     
     print("🔍 Verificando configuración de Gemini...\n")
     
@@ -42,14 +43,7 @@ def test_gemini_connection():
             HumanMessage(content="Responde con un simple 'OK' si estás funcionando.")
         ]
         
-        response = llm.invoke(messages)
-        
-        print(f"✅ Conexión exitosa!")
-        print(f"📝 Respuesta de Gemini: {response.content}\n")
-        
         # Test con un ejemplo de validación
-        print("🧪 Probando análisis de pedido...")
-        
         validation_messages = [
             HumanMessage(content="""
 Analiza este pedido y di si parece válido:
@@ -61,7 +55,16 @@ Responde solo: VÁLIDO o INVÁLIDO y una breve razón.
             """)
         ]
         
-        validation_response = llm.invoke(validation_messages)
+        # Las dos consultas son independientes: se solapan las esperas de red
+        response, validation_response = await asyncio.gather(
+            llm.ainvoke(messages),
+            llm.ainvoke(validation_messages)
+        )
+        
+        print(f"✅ Conexión exitosa!")
+        print(f"📝 Respuesta de Gemini: {response.content}\n")
+        
+        print("🧪 Probando análisis de pedido...")
         print(f"📊 Análisis: {validation_response.content}\n")
         
         print("=" * 50)
@@ -80,5 +83,10 @@ Responde solo: VÁLIDO o INVÁLIDO y una breve razón.
         return False
 
 
+def test_gemini_connection():
+    """Punto de entrada síncrono de la prueba"""
+    return asyncio.run(check_gemini_connection())
+
+
 if __name__ == "__main__":
     test_gemini_connection()
\ No newline at end of file